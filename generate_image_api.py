@@ -36,11 +36,14 @@ from __future__ import annotations
 
 import io
 import os
+import shutil
 import uuid
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
 from PIL import Image, ImageDraw, ImageFont
@@ -51,6 +54,13 @@ from video_generator import make_pan_scan_video, make_static_video_with_audio
 
 app = FastAPI(title=APP_NAME, description=APP_DESCRIPTION)
 
+# Sesión HTTP compartida (keep-alive): evita rehacer el handshake TCP+TLS
+# en cada descarga de imagen/logo cuando el host de origen se repite
+_HTTP = requests.Session()
+_HTTP_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=128)
+_HTTP.mount("https://", _HTTP_ADAPTER)
+_HTTP.mount("http://", _HTTP_ADAPTER)
+
 # Crear directorio de imágenes públicas si no existe
 os.makedirs(PUBLIC_IMAGES_DIR, exist_ok=True)
 
@@ -58,6 +68,19 @@ os.makedirs(PUBLIC_IMAGES_DIR, exist_ok=True)
 PUBLIC_VIDEOS_DIR = "/var/www/fastapi-image-generator/public/videos"
 os.makedirs(PUBLIC_VIDEOS_DIR, exist_ok=True)
 
+# URL base de los videos públicos, precalculada una sola vez
+PUBLIC_VIDEOS_URL = f"{BASE_URL}/public/videos"
+
+# Direcciones de pan válidas: frozenset para membership O(1) sin
+# reconstruir la lista en cada request
+VALID_DIRECTIONS = frozenset({
+    "left-to-right", "right-to-left",
+    "top-to-bottom", "bottom-to-top",
+    "zoom-in", "zoom-out",
+    "diagonal-tl-br", "diagonal-tr-bl",
+})
+_VALID_DIRECTIONS_MSG = f"direction must be one of: {', '.join(sorted(VALID_DIRECTIONS))}"
+
 
 def _save_image_and_get_url(image: Image.Image) -> str:
     """Save image to public directory and return public URL."""
@@ -74,11 +97,13 @@ def _save_image_and_get_url(image: Image.Image) -> str:
     return f"{BASE_URL}/public/images/{filename}"
 
 
+@lru_cache(maxsize=32)
 def _load_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
     """Load a font at the requested size.
 
     Attempts to load DejaVuSans on Linux or falls back to system fonts
-    on macOS and other platforms.
+    on macOS and other platforms. Results are memoized per (size, bold)
+    so repeated requests do not re-parse the font file.
 
     Args:
         size: Font size in points.
@@ -598,7 +623,7 @@ async def generate_image_from_url(
     
     # Download the base image from URL
     try:
-        response = requests.get(image_url, timeout=30)
+        response = _HTTP.get(image_url, timeout=30)
         response.raise_for_status()
         base_img = Image.open(io.BytesIO(response.content)).convert('RGBA')
     except requests.RequestException as exc:
@@ -610,7 +635,7 @@ async def generate_image_from_url(
     logo_img: Optional[Image.Image] = None
     if logo_url is not None:
         try:
-            logo_response = requests.get(logo_url, timeout=30)
+            logo_response = _HTTP.get(logo_url, timeout=30)
             logo_response.raise_for_status()
             logo_img = Image.open(io.BytesIO(logo_response.content)).convert('RGBA')
         except requests.RequestException as exc:
@@ -670,13 +695,12 @@ def _save_video_and_get_url(video_path: str) -> str:
     unique_id = str(uuid.uuid4())[:8]
     filename = f"video_{timestamp}_{unique_id}.mp4"
     
-    final_path = os.path.join(PUBLIC_VIDEOS_DIR, filename)
+    final_path = f"{PUBLIC_VIDEOS_DIR}/{filename}"
     
     # Move temp video to public directory
-    import shutil
     shutil.move(video_path, final_path)
     
-    return f"{BASE_URL}/public/videos/{filename}"
+    return f"{PUBLIC_VIDEOS_URL}/{filename}"
 
 
 @app.post("/generate-video-from-url", responses={
@@ -715,20 +739,19 @@ async def generate_video_from_url(
     if duration < 1 or duration > 30:
         raise HTTPException(status_code=400, detail="duration must be between 1 and 30 seconds")
     
-    valid_directions = [
-        "left-to-right", "right-to-left", 
-        "top-to-bottom", "bottom-to-top",
-        "zoom-in", "zoom-out",
-        "diagonal-tl-br", "diagonal-tr-bl"
-    ]
-    if direction not in valid_directions:
-        raise HTTPException(status_code=400, detail=f"direction must be one of: {', '.join(valid_directions)}")
+    if direction not in VALID_DIRECTIONS:
+        raise HTTPException(status_code=400, detail=_VALID_DIRECTIONS_MSG)
     
     # Download image
     try:
-        response = requests.get(image_url, timeout=30)
+        response = _HTTP.get(image_url, timeout=30)
         response.raise_for_status()
-        base_img = Image.open(io.BytesIO(response.content)).convert('RGBA')
+        # load() decodifica aquí para que un cuerpo truncado/corrupto siga
+        # siendo un 400 y no un 500 del pipeline (verify() no detecta JPEGs
+        # truncados). Se sigue evitando la copia extra: la única conversión
+        # de modo ocurre dentro del pipeline de video
+        base_img = Image.open(io.BytesIO(response.content))
+        base_img.load()
     except requests.RequestException as exc:
         raise HTTPException(status_code=400, detail=f"Could not download image from URL: {exc}")
     except Exception as exc:
@@ -853,7 +876,7 @@ async def generate_static_video_from_url(
     
     try:
         # Download image from URL
-        response = requests.get(image_url)
+        response = _HTTP.get(image_url, timeout=30)
         response.raise_for_status()
         base_img = Image.open(BytesIO(response.content))
         
@@ -3,38 +3,147 @@ Video Generator with Pan & Scan Effect
 Generates cinematic videos from images with text overlays
 """
 
+import hashlib
+import math
 import os
+import queue
+import shutil
 import subprocess
+import threading
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-import imageio
+import imageio_ffmpeg
 from typing import Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import numba  # opcional: kernel fusionado de pan+blend
+except ImportError:
+    numba = None
 import platform
 
+def _resolve_ffmpeg_exe() -> str:
+    """Resolve the ffmpeg binary once at import.
+
+    Prefiere el ffmpeg del sistema y cae al binario que trae
+    imageio-ffmpeg (el mismo que usa write_frames), evitando el lookup de
+    PATH por llamada y el caso de un 'ffmpeg' inexistente en el sistema.
+    """
+    exe = shutil.which('ffmpeg')
+    if exe:
+        return exe
+    try:
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return 'ffmpeg'
+
+
+FFMPEG_EXE = _resolve_ffmpeg_exe()
+
+def _nvenc_available() -> bool:
+    """Probe once at import whether ffmpeg can open an NVENC session.
+
+    Listar '-encoders' no basta: los builds estáticos anuncian h264_nvenc
+    aunque no haya GPU/driver, así que se intenta un encode mínimo real.
+    """
+    try:
+        result = subprocess.run(
+            [FFMPEG_EXE, '-hide_banner', '-v', 'error',
+             '-f', 'lavfi', '-i', 'color=black:size=64x64:duration=0.1',
+             '-c:v', 'h264_nvenc', '-f', 'null', '-'],
+            capture_output=True, timeout=15)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+
+_NVENC_AVAILABLE = _nvenc_available()
+
+# Flags de mux para MP4 streameable en una sola pasada: el moov queda al
+# inicio sin la segunda pasada de reescritura que exige +faststart
+MP4_STREAMING_FLAGS = '+frag_keyframe+empty_moov+default_base_moof'
 
-def load_image_cv2(image_path_or_pil) -> np.ndarray:
-    """Load image from path or PIL Image, return as BGR numpy array."""
+# Cache de overlays de texto renderizados: los mismos parámetros se repiten
+# entre regeneraciones (A/B de dirección, reintentos) y el rasterizado del
+# overlay es la parte cara. FIFO acotado para no crecer sin límite.
+_OVERLAY_CACHE = {}
+_OVERLAY_CACHE_MAX = 32
+
+
+def _cuda_available() -> bool:
+    """Check once whether OpenCV was built with a usable CUDA device."""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+_CUDA_AVAILABLE = _cuda_available()
+
+
+def load_image_cv2(image_path_or_pil, target_max_dim: Optional[int] = None) -> np.ndarray:
+    """Load image from path or PIL Image, return as RGB numpy array.
+
+    Todo el pipeline trabaja en RGB: el overlay de texto es RGBA, los
+    frames van a ffmpeg como rgb24 y PIL ya entrega RGB, así que solo la
+    ruta de archivo (cv2.imread decodifica BGR) paga una conversión.
+
+    Con `target_max_dim` la decodificación sale ya reducida cuando la
+    fuente es mucho más grande que el destino: IMREAD_REDUCED_COLOR_{2,4,8}
+    para archivos e Image.draft() (JPEG sin cargar) para PIL. Una foto 4K+
+    que termina en ~1080p no paga el decode completo. La reducción nunca
+    baja del tamaño pedido.
+    """
     if isinstance(image_path_or_pil, str):
-        img = cv2.imread(image_path_or_pil)
+        flags = cv2.IMREAD_COLOR
+        if target_max_dim:
+            try:
+                with Image.open(image_path_or_pil) as probe:
+                    src_max = max(probe.size)  # solo lee el header
+            except Exception:
+                src_max = 0
+            for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8),
+                                         (4, cv2.IMREAD_REDUCED_COLOR_4),
+                                         (2, cv2.IMREAD_REDUCED_COLOR_2)):
+                if src_max // factor >= target_max_dim:
+                    flags = reduced_flag
+                    break
+        img = cv2.imread(image_path_or_pil, flags)
         if img is None:
             raise ValueError(f"Could not load image: {image_path_or_pil}")
-        return img
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
     elif isinstance(image_path_or_pil, Image.Image):
-        # Convert PIL to OpenCV BGR
-        img_rgb = np.array(image_path_or_pil.convert('RGB'))
-        return cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
+        if target_max_dim and max(image_path_or_pil.size) > target_max_dim:
+            # Solo afecta a JPEG aún no cargados; en otros formatos es no-op
+            scale = target_max_dim / max(image_path_or_pil.size)
+            image_path_or_pil.draft('RGB', (int(image_path_or_pil.width * scale),
+                                            int(image_path_or_pil.height * scale)))
+        return np.array(image_path_or_pil.convert('RGB'))
     else:
         raise ValueError("Input must be file path or PIL Image")
 
 
-def resize_cover(img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-    """Resize image to cover target dimensions (like CSS background-size: cover)."""
+def resize_cover(img: np.ndarray, target_w: int, target_h: int,
+                 interpolation: Optional[int] = None) -> np.ndarray:
+    """Resize image to cover target dimensions (like CSS background-size: cover).
+
+    Por defecto elige la interpolación según el factor de escala: INTER_AREA
+    (SIMD, mejor calidad) al reducir e INTER_CUBIC al ampliar, en vez del
+    INTER_LANCZOS4 fijo que usa la ruta no vectorizada de OpenCV. Pasar
+    `interpolation` explícito para forzar otro kernel.
+    """
     h, w = img.shape[:2]
     scale = max(target_w / w, target_h / h)
-    new_w = int(w * scale)
-    new_h = int(h * scale)
-    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LANCZOS4)
+    # ceil + clamp: con int() a secas el redondeo flotante puede dejar la
+    # imagen un pixel corta respecto al target y el crop sale negativo
+    new_w = max(target_w, int(math.ceil(w * scale)))
+    new_h = max(target_h, int(math.ceil(h * scale)))
+    if interpolation is None:
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    resized = cv2.resize(img, (new_w, new_h), interpolation=interpolation)
     
     # Center crop
     x = (new_w - target_w) // 2
@@ -42,46 +151,135 @@ def resize_cover(img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
     return resized[y:y+target_h, x:x+target_w]
 
 
-def smoothstep(x: float) -> float:
-    """Smooth easing function (ease-in-out)."""
+def smoothstep(x):
+    """Smooth easing function (ease-in-out). Works on scalars and numpy arrays."""
     return x * x * (3 - 2 * x)
 
 
+# Covers ya escalados, por (hash de contenido, dims): re-renders del mismo
+# arte con otra dirección o duración se saltan el resize completo
+_BASE_COV_CACHE = {}
+_BASE_COV_CACHE_MAX = 8
+
+
+def _resize_cover_cached(img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
+    """resize_cover memoizado por hash del contenido de la imagen.
+
+    El array devuelto se comparte entre requests: los consumidores lo
+    tratan como solo lectura (warp/crop escriben buffers nuevos).
+    """
+    buf = img if img.flags['C_CONTIGUOUS'] else np.ascontiguousarray(img)
+    digest = hashlib.blake2b(buf, digest_size=16).digest()
+    cache_key = (digest, img.shape, target_w, target_h)
+    cached = _BASE_COV_CACHE.get(cache_key)
+    if cached is None:
+        cached = resize_cover(img, target_w, target_h)
+        if len(_BASE_COV_CACHE) >= _BASE_COV_CACHE_MAX:
+            _BASE_COV_CACHE.pop(next(iter(_BASE_COV_CACHE)))
+        _BASE_COV_CACHE[cache_key] = cached
+    return cached
+
+
+def compute_pan_schedule(
+    direction: str,
+    total_frames: int,
+    duration: float,
+    fps: int,
+    max_pan_x: float,
+    max_pan_y: float,
+    zoom_start: float,
+    zoom_end: float,
+    ease_in_out: bool,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Precompute the per-frame (tx, ty, zoom) schedule as numpy arrays.
+
+    Vectoriza el easing y el cálculo de pan/zoom de todos los frames de una
+    vez, en lugar de recalcularlos frame a frame dentro del loop.
+
+    Returns:
+        Tuple (tx, ty, zoom) of float32 arrays of length total_frames.
+    """
+    p = np.arange(total_frames, dtype=np.float32) / (fps * duration)
+
+    if ease_in_out:
+        p = smoothstep(p)
+
+    zoom = zoom_start + (zoom_end - zoom_start) * p
+    tx = np.zeros(total_frames, dtype=np.float32)
+    ty = np.zeros(total_frames, dtype=np.float32)
+
+    if direction == "left-to-right":
+        tx = -max_pan_x + (2 * max_pan_x * p)
+    elif direction == "right-to-left":
+        tx = max_pan_x - (2 * max_pan_x * p)
+    elif direction == "top-to-bottom":
+        ty = -max_pan_y + (2 * max_pan_y * p)
+    elif direction == "bottom-to-top":
+        ty = max_pan_y - (2 * max_pan_y * p)
+    elif direction == "diagonal-tl-br":
+        tx = -max_pan_x + (2 * max_pan_x * p)
+        ty = -max_pan_y + (2 * max_pan_y * p)
+    elif direction == "diagonal-tr-bl":
+        tx = max_pan_x - (2 * max_pan_x * p)
+        ty = -max_pan_y + (2 * max_pan_y * p)
+    elif direction == "zoom-in":
+        zoom = 1.0 + (0.2 * p)
+    elif direction == "zoom-out":
+        zoom = 1.2 - (0.2 * p)
+
+    return (
+        tx.astype(np.float32, copy=False),
+        ty.astype(np.float32, copy=False),
+        zoom.astype(np.float32, copy=False),
+    )
+
+
+def compute_affine_matrices(tx: np.ndarray, ty: np.ndarray, zoom: np.ndarray,
+                            cx: float, cy: float, inverse: bool = False) -> np.ndarray:
+    """Build every per-frame 2x3 affine matrix in one vectorized pass.
+
+    Forma cerrada del caso sin rotación que usa el pan & scan:
+    M = [[z, 0, (1-z)*cx + tx], [0, z, (1-z)*cy + ty]].
+
+    Con inverse=True devuelve la matriz inversa en forma cerrada, lista
+    para cv2.warpAffine con WARP_INVERSE_MAP (evita que OpenCV invierta
+    la matriz en cada llamada).
+
+    Returns:
+        Array float32 de forma (N, 2, 3); cada M[i] es contiguo y se puede
+        pasar directo a cv2.warpAffine.
+    """
+    n = tx.shape[0]
+    M = np.zeros((n, 2, 3), dtype=np.float32)
+    if inverse:
+        inv_zoom = 1.0 / zoom
+        M[:, 0, 0] = inv_zoom
+        M[:, 1, 1] = inv_zoom
+        M[:, 0, 2] = -((1.0 - zoom) * cx + tx) * inv_zoom
+        M[:, 1, 2] = -((1.0 - zoom) * cy + ty) * inv_zoom
+    else:
+        M[:, 0, 0] = zoom
+        M[:, 1, 1] = zoom
+        M[:, 0, 2] = (1.0 - zoom) * cx + tx
+        M[:, 1, 2] = (1.0 - zoom) * cy + ty
+    return M
+
+
 def make_affine_matrix(tx: float, ty: float, zoom: float, angle: float, cx: float, cy: float) -> np.ndarray:
-    """Create 2D affine transformation matrix."""
-    A = np.eye(3, dtype=np.float32)
-    
-    # Translate to origin
-    A[0, 2] = -cx
-    A[1, 2] = -cy
-    
-    # Scale (zoom)
-    S = np.eye(3, dtype=np.float32)
-    S[0, 0] = zoom
-    S[1, 1] = zoom
-    A = S @ A
-    
-    # Rotate
+    """Create a 2x3 affine matrix: zoom+rotación alrededor del centro, más pan.
+
+    Forma cerrada de T(centro+pan) @ R @ S @ T(-centro), lista para
+    cv2.warpAffine sin la cadena de matmuls 3x3 ni conversión posterior.
+    """
     if angle != 0:
         rad = np.deg2rad(angle)
-        cos_a, sin_a = np.cos(rad), np.sin(rad)
-        R = np.array([
-            [cos_a, -sin_a, 0],
-            [sin_a, cos_a, 0],
-            [0, 0, 1]
-        ], dtype=np.float32)
-        A = R @ A
-    
-    # Translate back + pan
-    A[0, 2] += cx + tx
-    A[1, 2] += cy + ty
-    
-    return A
-
-
-def affine_to_perspective(A: np.ndarray) -> np.ndarray:
-    """Convert 3x3 affine to OpenCV 2x3 perspective matrix."""
-    return A[:2, :]
+        cos_a, sin_a = float(np.cos(rad)), float(np.sin(rad))
+    else:
+        cos_a, sin_a = 1.0, 0.0
+    return np.array([
+        [zoom * cos_a, -zoom * sin_a, cx + tx - zoom * (cos_a * cx - sin_a * cy)],
+        [zoom * sin_a,  zoom * cos_a, cy + ty - zoom * (sin_a * cx + cos_a * cy)],
+    ], dtype=np.float32)
 
 
 def apply_transform(img: np.ndarray, M: np.ndarray, output_size: Tuple[int, int]) -> np.ndarray:
@@ -90,7 +288,7 @@ def apply_transform(img: np.ndarray, M: np.ndarray, output_size: Tuple[int, int]
 
 
 def apply_overlay(base: np.ndarray, overlay: np.ndarray) -> np.ndarray:
-    """Apply RGBA overlay onto BGR base image."""
+    """Apply RGBA overlay onto RGB base image."""
     if overlay.shape[2] == 4:  # RGBA
         alpha = overlay[:, :, 3:4] / 255.0
         overlay_rgb = overlay[:, :, :3]
@@ -100,8 +298,221 @@ def apply_overlay(base: np.ndarray, overlay: np.ndarray) -> np.ndarray:
     return base.astype(np.uint8)
 
 
+def _crop_translated(img: np.ndarray, tx: float, ty: float,
+                     x0: int, y0: int, out_w: int, out_h: int) -> np.ndarray:
+    """Extract the pan window for a pure translation (zoom=1, no rotation).
+
+    En vez de un warpAffine bilineal sobre todo el canvas, recorta
+    directamente la ventana entera y resuelve solo el resto subpixel con
+    un warp mínimo sobre la región recortada.
+    """
+    h, w = img.shape[:2]
+    sx = x0 - tx
+    sy = y0 - ty
+    ix, fx = divmod(sx, 1.0)
+    iy, fy = divmod(sy, 1.0)
+    ix = max(0, min(int(ix), w - out_w - 1))
+    iy = max(0, min(int(iy), h - out_h - 1))
+
+    if fx == 0.0 and fy == 0.0:
+        # Copy so the caller can blend in place without touching the source
+        return img[iy:iy + out_h, ix:ix + out_w].copy()
+
+    window = img[iy:iy + out_h + 1, ix:ix + out_w + 1]
+    M = np.array([[1.0, 0.0, -fx], [0.0, 1.0, -fy]], dtype=np.float32)
+    return cv2.warpAffine(window, M, (out_w, out_h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+
+def _render_frames_cuda(base_cov, sched_M_inv, total_frames,
+                        out_w, out_h, overlay_blend):
+    """Render warped frames on the GPU, uploading the source once.
+
+    El warp corre en CUDA y escribe directo el tamaño de salida (el
+    recorte va plegado en las matrices); el blend del overlay (región
+    chica) se hace en CPU tras la descarga del frame.
+    """
+    gpu_base = cv2.cuda_GpuMat()
+    gpu_base.upload(base_cov)
+    for i in range(total_frames):
+        gpu_out = cv2.cuda.warpAffine(
+            gpu_base, sched_M_inv[i], (out_w, out_h),
+            flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_REPLICATE)
+        frame = gpu_out.download()
+        if overlay_blend is not None:
+            frame = _blend_overlay(frame, overlay_blend)
+        yield frame
+
+
+def _prepare_overlay_blend(overlay: np.ndarray):
+    """Precompute the blend state for a static RGBA overlay.
+
+    Deriva una sola vez el alpha premultiplicado (float32) y el bounding
+    box de los píxeles visibles, para que el blend por frame toque solo
+    esa región en vez de recalcular alpha sobre el frame completo.
+
+    Returns:
+        Tuple (y0, y1, x0, x1, one_minus_alpha, premult_rgb), or None if
+        the overlay has no visible pixels.
+    """
+    if overlay.shape[2] != 4:
+        return None
+    alpha_channel = overlay[:, :, 3]
+    ys, xs = np.nonzero(alpha_channel)
+    if ys.size == 0:
+        return None
+    y0, y1 = int(ys.min()), int(ys.max()) + 1
+    x0, x1 = int(xs.min()), int(xs.max()) + 1
+    roi = overlay[y0:y1, x0:x1]
+    # Aritmética fija uint16 (0..65025 = 255*255): la mitad del ancho de
+    # banda de float32 y sin divisiones por frame
+    alpha16 = roi[:, :, 3:4].astype(np.uint16)
+    inv_alpha16 = 255 - alpha16
+    premult16 = roi[:, :, :3].astype(np.uint16) * alpha16
+    return y0, y1, x0, x1, inv_alpha16, premult16
+
+
+@lru_cache(maxsize=16)
+def _make_watermark_bar(height: int, bar_width: int, watermark: str,
+                        font_size: int) -> np.ndarray:
+    """Rasterize the vertical watermark strip once, cached.
+
+    Depende solo de (height, bar_width, watermark, font_size), así que la
+    franja rotada se cachea como buffer RGBA y create_text_overlay solo
+    la pega.
+    """
+    font_side = _load_font_for_video(font_size, bold=False)
+    temp = Image.new('RGBA', (height, bar_width), (0, 0, 0, 0))
+    draw_temp = ImageDraw.Draw(temp)
+    phrase = watermark + '   '
+    phrase_width = draw_temp.textlength(phrase, font=font_side)
+    repeats = int((height / phrase_width)) + 3
+    y_offset = (bar_width - font_side.getbbox('Ay')[3]) // 2
+    # La frase se rasteriza una sola vez y se pega repetida: FreeType
+    # moldea O(frase) glifos en vez de O(frase * repeticiones)
+    tile = Image.new('RGBA', (int(math.ceil(phrase_width)), bar_width), (0, 0, 0, 0))
+    ImageDraw.Draw(tile).text((0, y_offset), phrase, font=font_side,
+                              fill=(255, 255, 255, 150))
+    for k in range(repeats):
+        temp.paste(tile, (int(k * phrase_width), 0), tile)
+    # np.rot90 es manipulación de strides + una copia, más barato que el
+    # resampleo de Image.rotate (idéntico bit a bit para 90 grados)
+    return np.ascontiguousarray(np.rot90(np.asarray(temp)))
+
+
+# Logos ya cargados en RGBA, por (path, mtime): el mismo PNG se relee en
+# cada overlay si no está cacheado.
+_LOGO_CACHE = {}
+
+
+def _load_logo_rgba(logo_path: str):
+    """Load a logo image as RGBA, cached by (path, mtime)."""
+    try:
+        cache_key = (logo_path, os.path.getmtime(logo_path))
+        cached = _LOGO_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        # Cargar logo SIN convertir primero, para preservar colores
+        logo_temp = Image.open(logo_path)
+        if logo_temp.mode != 'RGBA':
+            logo_temp = logo_temp.convert('RGBA')
+        print(f"✅ Logo cargado desde: {logo_path} (modo: {logo_temp.mode})")
+        _LOGO_CACHE[cache_key] = logo_temp
+        return logo_temp
+    except Exception:
+        return None
+
+
+# Scratch uint16 buffer for el blend, por hilo: los frames se renderizan en
+# un ThreadPoolExecutor, así que cada worker reutiliza el suyo en vez de
+# alocar uno nuevo por frame.
+_BLEND_SCRATCH = threading.local()
+
+
+def _blend_scratch(shape) -> np.ndarray:
+    buf = getattr(_BLEND_SCRATCH, 'buf', None)
+    if buf is None or buf.shape != shape:
+        buf = np.empty(shape, dtype=np.uint16)
+        _BLEND_SCRATCH.buf = buf
+    return buf
+
+
+def _blend_overlay(frame: np.ndarray, blend_state) -> np.ndarray:
+    """Blend a precomputed overlay state into an RGB frame, in place.
+
+    Usa blend de punto fijo uint16: (base*(255-a) + rgb*a + 127) >> 8,
+    que aproxima la división por 255 con error máximo de 1 LSB.
+    """
+    y0, y1, x0, x1, inv_alpha16, premult16 = blend_state
+    roi = _blend_scratch((y1 - y0, x1 - x0, 3))
+    np.copyto(roi, frame[y0:y1, x0:x1], casting='unsafe')
+    np.multiply(roi, inv_alpha16, out=roi)
+    np.add(roi, premult16, out=roi)
+    np.add(roi, 127, out=roi)
+    np.right_shift(roi, 8, out=roi)
+    frame[y0:y1, x0:x1] = roi
+    return frame
+
+
+if numba is not None:
+    # Sin parallel=True a propósito: el paralelismo ya viene del
+    # ThreadPoolExecutor a nivel de frame, y el runtime workqueue que
+    # arrastra un kernel paralelo cuelga el proceso al salir del
+    # intérprete (y no tolera llamadas concurrentes). Un kernel serial
+    # en nopython suelta el GIL y es seguro entre hilos.
+    @numba.njit(nogil=True, fastmath=True, cache=True)
+    def _pan_blend_kernel(base, sy, sx, oy0, oy1, ox0, ox1, inv_alpha, premult, out):
+        """Recorte por traslación entera + blend del overlay, en una pasada.
+
+        Fusiona crop y blend: una lectura de base, una del overlay y una
+        escritura por pixel.
+        """
+        out_h = out.shape[0]
+        out_w = out.shape[1]
+        for y in range(out_h):
+            for x in range(out_w):
+                if oy0 <= y < oy1 and ox0 <= x < ox1:
+                    # inv_alpha trae un solo canal (broadcast en numpy)
+                    a_inv = int(inv_alpha[y - oy0, x - ox0, 0])
+                    for c in range(3):
+                        v = int(base[y + sy, x + sx, c]) * a_inv
+                        out[y, x, c] = (v + int(premult[y - oy0, x - ox0, c]) + 127) >> 8
+                else:
+                    for c in range(3):
+                        out[y, x, c] = base[y + sy, x + sx, c]
+
+    # Warm-compile con arrays mínimos para pagar el JIT en el import
+    _pan_blend_kernel(
+        np.zeros((2, 2, 3), np.uint8), 0, 0, 0, 1, 0, 1,
+        np.zeros((1, 1, 3), np.uint16), np.zeros((1, 1, 3), np.uint16),
+        np.empty((2, 2, 3), np.uint8),
+    )
+
+    _EMPTY_BLEND_U16 = np.zeros((0, 0, 1), np.uint16)
+
+    def _render_pan_blend(base, sy, sx, out_w, out_h, blend_state):
+        """Render a pure integer-pan frame with the fused Numba kernel."""
+        out = np.empty((out_h, out_w, 3), np.uint8)
+        if blend_state is not None:
+            oy0, oy1, ox0, ox1, inv_alpha16, premult16 = blend_state
+        else:
+            oy0 = oy1 = ox0 = ox1 = 0
+            inv_alpha16 = _EMPTY_BLEND_U16
+            premult16 = np.zeros((0, 0, 3), np.uint16)
+        _pan_blend_kernel(base, sy, sx, oy0, oy1, ox0, ox1,
+                          inv_alpha16, premult16, out)
+        return out
+
+
+@lru_cache(maxsize=32)
 def _load_font_for_video(size: int, bold: bool = False):
-    """Load font for video overlay (similar to image generator)."""
+    """Load font for video overlay (similar to image generator).
+
+    Cacheado por (size, bold): cada overlay pide tres fuentes y
+    ImageFont.truetype reabre y parsea el archivo en cada intento. Los
+    objetos de fuente de Pillow son seguros para renderizar entre hilos.
+    """
     system = platform.system()
     
     # Try system fonts based on OS
@@ -149,13 +560,22 @@ def create_text_overlay(
     Create text overlay with same style as image generator.
     Includes logo in top-right corner (EXACT same as generate_image_api.py).
     Returns RGBA numpy array.
+
+    El resultado se cachea por parámetros: el array devuelto es compartido
+    y no debe mutarse.
     """
+    cache_key = (width, height, headline, highlight, watermark,
+                 highlight_color, text_color, box_color, logo_path, logo_scale)
+    cached = _OVERLAY_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
     # Create transparent overlay
     overlay = Image.new('RGBA', (width, height), (0, 0, 0, 0))
     draw = ImageDraw.Draw(overlay)
     
     if not headline:
-        return np.array(overlay)
+        return _overlay_cache_put(cache_key, np.array(overlay))
     
     # Font sizes - ajustados según el aspecto del video
     # Si es horizontal (width > height), usar fuentes más grandes
@@ -181,38 +601,20 @@ def create_text_overlay(
         # Formato vertical
         bar_width = int(width * 0.05)
     
-    temp = Image.new('RGBA', (height, bar_width), (0, 0, 0, 0))
-    draw_temp = ImageDraw.Draw(temp)
-    phrase = watermark + '   '
-    phrase_width = draw_temp.textlength(phrase, font=font_side)
-    repeats = int((height / phrase_width)) + 3
-    full_text = phrase * repeats
-    y_offset = (bar_width - font_side.getbbox('Ay')[3]) // 2
-    draw_temp.text((0, y_offset), full_text, font=font_side, fill=(255, 255, 255, 150))
-    vertical_img = temp.rotate(90, expand=True)
+    vertical_img = Image.fromarray(_make_watermark_bar(height, bar_width,
+                                                       watermark, side_font_size))
     overlay.paste(vertical_img, (0, 0), vertical_img)
     
     # Load and paste logo in top-right corner (EXACT SAME as generate_image_api.py)
-    # IMPORTANTE: Preservar colores originales del logo
+    # IMPORTANTE: Preservar colores originales del logo (cacheado por archivo)
     logo_image = None
     if logo_path:
-        try:
-            # Cargar logo SIN convertir primero, para preservar colores
-            logo_temp = Image.open(logo_path)
-            # Si tiene transparencia, mantenerla; si no, agregarla
-            if logo_temp.mode == 'RGBA':
-                logo_image = logo_temp
-            elif logo_temp.mode == 'RGB':
-                # Crear canal alpha basado en la imagen
-                logo_image = logo_temp.convert('RGBA')
-            else:
-                logo_image = logo_temp.convert('RGBA')
-        except Exception as e:
-            print(f"⚠️  No se pudo cargar logo desde {logo_path}: {e}")
+        logo_image = _load_logo_rgba(logo_path)
+        if logo_image is None:
+            print(f"⚠️  No se pudo cargar logo desde {logo_path}")
     
     if logo_image is None:
         # Try to load default logo from current directory or script directory
-        import os
         script_dir = os.path.dirname(os.path.abspath(__file__))
         default_paths = [
             'El_Dia.png',
@@ -220,19 +622,9 @@ def create_text_overlay(
             '/Users/fcolabbe/Downloads/imagen/El_Dia.png'
         ]
         for path in default_paths:
-            try:
-                # Cargar logo preservando colores originales
-                logo_temp = Image.open(path)
-                if logo_temp.mode == 'RGBA':
-                    logo_image = logo_temp
-                elif logo_temp.mode == 'RGB':
-                    logo_image = logo_temp.convert('RGBA')
-                else:
-                    logo_image = logo_temp.convert('RGBA')
-                print(f"✅ Logo cargado desde: {path} (modo: {logo_temp.mode})")
+            logo_image = _load_logo_rgba(path)
+            if logo_image is not None:
                 break
-            except:
-                continue
     
     if logo_image is not None:
         logo_w = int(width * logo_scale)
@@ -256,7 +648,14 @@ def create_text_overlay(
         available_width = width - bar_width - 10
     
     draw_dummy = ImageDraw.Draw(Image.new('RGB', (10, 10)))
-    
+
+    # Anchos por carácter memoizados una sola vez: el wrap y la medición de
+    # líneas los consultan miles de veces y cada textlength es un cruce a
+    # FreeType
+    headline_chars = set(headline) | {' '}
+    reg_char_w = {c: draw_dummy.textlength(c, font=font_reg) for c in headline_chars}
+    bold_char_w = {c: draw_dummy.textlength(c, font=font_bold) for c in headline_chars}
+
     # Create a character-by-character map of which characters are highlighted
     highlight_mask = [False] * len(headline)
     if highlight and highlight in headline:
@@ -268,22 +667,30 @@ def create_text_overlay(
     
     # Word-based wrapping that preserves exact highlight positions and doesn't cut words
     def wrap_text_with_highlights(text, highlight_mask, font, max_width):
-        """Wrap text by words while preserving exact character-level highlight information."""
+        """Wrap text by words, preserving char-level highlights.
+
+        Cada palabra se mide una sola vez y el ancho de la línea se lleva
+        de forma incremental, así que las líneas salen ya medidas:
+        devuelve tuplas (line_text, line_highlights, line_width) y el
+        resto de la función reutiliza esos anchos sin volver a medir.
+        """
         
         def calculate_real_width(text_str, highlights_list):
             """Calculate the REAL width as it will be drawn, char by char with correct fonts."""
             total_width = 0
             for i, char in enumerate(text_str):
                 is_highlighted = i < len(highlights_list) and highlights_list[i]
-                char_font = font_bold if is_highlighted else font_reg
-                total_width += draw_dummy.textlength(char, font=char_font)
+                char_widths = bold_char_w if is_highlighted else reg_char_w
+                total_width += char_widths[char]
             return total_width
         
+        space_width = reg_char_w[' ']
         lines = []
         words = text.split()  # Split by whitespace
         
         current_line_words = []
         current_line_highlights = []
+        current_line_width = 0
         char_position = 0
         
         for word in words:
@@ -299,16 +706,12 @@ def create_text_overlay(
                 else:
                     word_highlight_chars.append(False)
             
-            # Build candidate line with proper spacing
+            # Measure the word once; the candidate line width is incremental
+            word_width = calculate_real_width(word, word_highlight_chars)
             if current_line_words:
-                candidate_text = " ".join(current_line_words + [word])
-                candidate_highlights = current_line_highlights + [False] + word_highlight_chars  # False for space
+                candidate_width = current_line_width + space_width + word_width
             else:
-                candidate_text = word
-                candidate_highlights = word_highlight_chars
-            
-            # Calculate REAL width as it will be rendered
-            candidate_width = calculate_real_width(candidate_text, candidate_highlights)
+                candidate_width = word_width
             
             # Be VERY conservative - use 80% of available width with safety margin
             if candidate_width * 1.15 <= max_width:  # 15% safety margin
@@ -316,15 +719,17 @@ def create_text_overlay(
                 if current_line_highlights:
                     current_line_highlights.append(False)  # Add space highlight
                 current_line_highlights.extend(word_highlight_chars)
+                current_line_width = candidate_width
             else:
                 # Line is full, save it and start new line
                 if current_line_words:
                     line_text = " ".join(current_line_words)
-                    lines.append((line_text, current_line_highlights))
+                    lines.append((line_text, current_line_highlights, current_line_width))
                 
                 # Start new line with current word
                 current_line_words = [word]
                 current_line_highlights = word_highlight_chars
+                current_line_width = word_width
             
             # Update character position
             char_position = word_end
@@ -332,7 +737,7 @@ def create_text_overlay(
         # Add the last line
         if current_line_words:
             line_text = " ".join(current_line_words)
-            lines.append((line_text, current_line_highlights))
+            lines.append((line_text, current_line_highlights, current_line_width))
         
         return lines
     
@@ -341,28 +746,14 @@ def create_text_overlay(
     wrap_factor = 0.85  # Factor estándar para todos los formatos
     wrapped_lines = wrap_text_with_highlights(headline, highlight_mask, font_reg, available_width * wrap_factor)
     
-    # Calculate dimensions for each line
+    # Calculate dimensions for each line (widths ya vienen medidos del wrap)
     padding_x = 20
     padding_y = 10
     line_spacing = 8
     line_heights = []
-    line_widths = []
-    
-    # Helper function to calculate real width char by char (same logic as in wrapping)
-    def calculate_line_real_width(text_str, highlights_list):
-        """Calculate the REAL width as it will be drawn, char by char with correct fonts."""
-        total_width = 0
-        for i, char in enumerate(text_str):
-            is_highlighted = i < len(highlights_list) and highlights_list[i]
-            char_font = font_bold if is_highlighted else font_reg
-            total_width += draw_dummy.textlength(char, font=char_font)
-        return total_width
-    
-    for line_text, line_highlights in wrapped_lines:
-        # Calculate REAL width considering bold and regular characters
-        real_width = calculate_line_real_width(line_text, line_highlights)
-        line_widths.append(real_width)
-        
+    line_widths = [line_width for _, _, line_width in wrapped_lines]
+    
+    for line_text, line_highlights, _ in wrapped_lines:
         # Height can use regular font as reference
         bbox = draw_dummy.textbbox((0, 0), line_text, font=font_reg)
         line_heights.append(bbox[3] - bbox[1])
@@ -373,8 +764,14 @@ def create_text_overlay(
     start_y = height - total_boxes_height - 20
     current_y = start_y
     
+    # Calculate baseline offset to align bold and regular text (constant,
+    # so it is measured once instead of per line)
+    regular_bbox = draw_dummy.textbbox((0, 0), "Ay", font=font_reg)
+    bold_bbox = draw_dummy.textbbox((0, 0), "Ay", font=font_bold)
+    baseline_offset = regular_bbox[3] - bold_bbox[3]
+    
     # Draw each line with variable width and centered
-    for idx, (line_text, line_highlights) in enumerate(wrapped_lines):
+    for idx, (line_text, line_highlights, _) in enumerate(wrapped_lines):
         text_w = line_widths[idx]
         text_h = line_heights[idx]
         box_w = text_w + 2 * padding_x
@@ -387,48 +784,66 @@ def create_text_overlay(
         # Draw box
         draw.rectangle([x, y, x + box_w, y + box_h], fill=box_color)
         
-        # Draw text character by character with appropriate colors and fonts
+        # Draw text run by run with appropriate colors and fonts
         text_x = x + padding_x
         
-        # Calculate baseline offset to align bold and regular text
-        regular_bbox = draw_dummy.textbbox((0, 0), "Ay", font=font_reg)
-        bold_bbox = draw_dummy.textbbox((0, 0), "Ay", font=font_bold)
-        regular_baseline = regular_bbox[3]  # bottom of regular font
-        bold_baseline = bold_bbox[3]  # bottom of bold font
-        baseline_offset = regular_baseline - bold_baseline
-        
-        # Calculate vertical centering - get actual text height
-        text_bbox = draw_dummy.textbbox((0, 0), line_text, font=font_reg)
-        actual_text_height = text_bbox[3] - text_bbox[1]
+        # Center text vertically in the box (line_heights already measured
+        # the same bbox, no need for another textbbox pass)
+        text_y_offset = y + padding_y + (box_h - 2 * padding_y - text_h) // 2
         
-        # Center text vertically in the box
-        text_y_offset = y + padding_y + (box_h - 2 * padding_y - actual_text_height) // 2
-        
-        for char_idx, char in enumerate(line_text):
-            # Check if this character is highlighted
-            is_highlighted = char_idx < len(line_highlights) and line_highlights[char_idx]
-            color = highlight_color if is_highlighted else text_color
-            font = font_bold if is_highlighted else font_reg
+        # Dibujar por tramos: los caracteres consecutivos con el mismo estilo
+        # salen en una sola llamada a draw.text en vez de una por carácter
+        run_start = 0
+        while run_start < len(line_text):
+            run_highlighted = run_start < len(line_highlights) and line_highlights[run_start]
+            run_end = run_start + 1
+            while (run_end < len(line_text)
+                   and (run_end < len(line_highlights) and line_highlights[run_end]) == run_highlighted):
+                run_end += 1
+            run_text = line_text[run_start:run_end]
+            
+            color = highlight_color if run_highlighted else text_color
+            font = font_bold if run_highlighted else font_reg
+            char_widths = bold_char_w if run_highlighted else reg_char_w
             
             # Adjust Y position for bold text to align with regular text + vertical centering
-            y_position = text_y_offset + (baseline_offset if is_highlighted else 0)
+            y_position = text_y_offset + (baseline_offset if run_highlighted else 0)
             
-            # Draw the character
-            draw.text((text_x, y_position), char, font=font, fill=color)
+            draw.text((text_x, y_position), run_text, font=font, fill=color)
             
-            # Move x position (use the correct font for width calculation)
-            char_width = draw_dummy.textlength(char, font=font)
-            text_x += char_width
+            # Advance by the same per-character widths used to size the box
+            text_x += sum(char_widths[c] for c in run_text)
+            run_start = run_end
         
         # Move to next line
         current_y += box_h + line_spacing
     
-    return np.array(overlay)
+    return _overlay_cache_put(cache_key, np.array(overlay))
+
+
+def _overlay_cache_put(cache_key, overlay_arr: np.ndarray) -> np.ndarray:
+    """Store a rendered overlay in the bounded FIFO cache and return it."""
+    if len(_OVERLAY_CACHE) >= _OVERLAY_CACHE_MAX:
+        _OVERLAY_CACHE.pop(next(iter(_OVERLAY_CACHE)))
+    _OVERLAY_CACHE[cache_key] = overlay_arr
+    return overlay_arr
+
+
+# Duraciones de audio ya sondeadas, por (path, mtime): el mismo clip se
+# consulta varias veces por request y cada sondeo es un proceso ffprobe.
+# FIFO acotado: los endpoints suben audios a paths únicos por request.
+_AUDIO_DURATION_CACHE = {}
+_AUDIO_DURATION_CACHE_MAX = 32
 
 
 def get_audio_duration(audio_path: str) -> float:
-    """Get duration of audio file in seconds using ffmpeg."""
-    import subprocess
+    """Get duration of audio file in seconds using ffmpeg (cached per file)."""
+    try:
+        cache_key = (audio_path, os.path.getmtime(audio_path))
+    except OSError:
+        cache_key = None
+    if cache_key in _AUDIO_DURATION_CACHE:
+        return _AUDIO_DURATION_CACHE[cache_key]
     try:
         cmd = [
             'ffprobe',
@@ -438,10 +853,15 @@ def get_audio_duration(audio_path: str) -> float:
             audio_path
         ]
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
+        duration = float(result.stdout.strip())
     except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
         # Si no se puede obtener la duración, retornar None
-        return None
+        duration = None
+    if cache_key is not None:
+        if len(_AUDIO_DURATION_CACHE) >= _AUDIO_DURATION_CACHE_MAX:
+            _AUDIO_DURATION_CACHE.pop(next(iter(_AUDIO_DURATION_CACHE)))
+        _AUDIO_DURATION_CACHE[cache_key] = duration
+    return duration
 
 
 def make_pan_scan_video(
@@ -459,6 +879,8 @@ def make_pan_scan_video(
     ease_in_out: bool = True,
     audio_path: Optional[str] = None,
     keep_aspect: bool = True,
+    encoder_preset: str = "ultrafast",
+    crf: int = 20,
 ):
     """
     Generate a video file with cinematic Pan & Scan effect.
@@ -483,6 +905,10 @@ def make_pan_scan_video(
         audio_path: Optional path to audio file (mp3, wav, etc.)
             Si se proporciona, la duración del video se ajusta a la del audio
         keep_aspect: Si True, mantiene el aspecto original de la imagen (ignora out_w/out_h)
+        encoder_preset: Preset de x264. Para videos cortos de API,
+            "ultrafast" codifica varias veces más rápido que "medium" con
+            calidad visual similar; subir a "medium"/"slow" si importa el bitrate
+        crf: Factor de calidad de x264 (menor = mejor calidad, más bitrate)
     """
     # Si hay audio, ajustar la duración del video a la duración del audio
     if audio_path:
@@ -491,7 +917,12 @@ def make_pan_scan_video(
             duration = audio_duration
             print(f"📏 Ajustando duración del video a {duration:.2f}s (duración del audio)")
     
-    base = load_image_cv2(image_input)
+    # Con destino conocido, decodificar ya reducido: el canvas más grande
+    # usa margen 1.25x sobre las dimensiones de salida
+    target_max_dim = None
+    if not keep_aspect and out_w and out_h:
+        target_max_dim = int(max(out_w, out_h) * 1.25)
+    base = load_image_cv2(image_input, target_max_dim=target_max_dim)
     
     # Si keep_aspect es True, usar dimensiones originales de la imagen
     if keep_aspect:
@@ -516,7 +947,7 @@ def make_pan_scan_video(
         margin_w = 1.15
         margin_h = 1.15
     
-    base_cov = resize_cover(base, int(out_w * margin_w), int(out_h * margin_h))
+    base_cov = _resize_cover_cached(base, int(out_w * margin_w), int(out_h * margin_h))
     H, W = base_cov.shape[:2]
     cx, cy = W / 2.0, H / 2.0
     
@@ -525,125 +956,149 @@ def make_pan_scan_video(
     
     # Create static text overlay
     text_overlay = create_text_overlay(out_w, out_h, headline, highlight)
+    # Precompute alpha/ROI once: the overlay is static across all frames
+    overlay_blend = _prepare_overlay_blend(text_overlay)
     
     # Calculate total frames
     total_frames = int(duration * fps)
-    
-    # Generate all frames
-    frames = []
-    for frame_num in range(total_frames):
-        t = frame_num / fps
-        p = t / duration
-        
-        if ease_in_out:
-            p = smoothstep(p)
-        
-        zoom = zoom_start + (zoom_end - zoom_start) * p
-        
-        # Calculate pan based on direction
-        if direction == "left-to-right":
-            tx = -max_pan_x + (2 * max_pan_x * p)
-            ty = 0
-        elif direction == "right-to-left":
-            tx = max_pan_x - (2 * max_pan_x * p)
-            ty = 0
-        elif direction == "top-to-bottom":
-            tx = 0
-            ty = -max_pan_y + (2 * max_pan_y * p)
-        elif direction == "bottom-to-top":
-            tx = 0
-            ty = max_pan_y - (2 * max_pan_y * p)
-        elif direction == "diagonal-tl-br":
-            tx = -max_pan_x + (2 * max_pan_x * p)
-            ty = -max_pan_y + (2 * max_pan_y * p)
-        elif direction == "diagonal-tr-bl":
-            tx = max_pan_x - (2 * max_pan_x * p)
-            ty = -max_pan_y + (2 * max_pan_y * p)
-        elif direction == "zoom-in":
-            tx = 0
-            ty = 0
-            zoom = 1.0 + (0.2 * p)
-        elif direction == "zoom-out":
-            tx = 0
-            ty = 0
-            zoom = 1.2 - (0.2 * p)
+
+    # Precompute the whole pan/zoom schedule in one vectorized pass
+    sched_tx, sched_ty, sched_zoom = compute_pan_schedule(
+        direction, total_frames, duration, fps,
+        max_pan_x, max_pan_y, zoom_start, zoom_end, ease_in_out,
+    )
+
+    # Stream frames directly to the encoder instead of buffering the whole
+    # video in RAM. Los frames ya están en RGB (igual que el overlay), así
+    # que van como rgb24 y swscale hace el empaquetado a yuv420p dentro de
+    # ffmpeg, sin flip de canales por frame en Python. Si hay audio, entra
+    # como segundo input del mismo proceso ffmpeg: una sola pasada.
+    if _NVENC_AVAILABLE:
+        # Encode en GPU: NVENC no usa los presets de x264
+        video_codec = 'h264_nvenc'
+        output_params = ['-preset', 'p4', '-tune', 'll', '-cq', str(crf),
+                         '-movflags', MP4_STREAMING_FLAGS]
+    else:
+        video_codec = 'libx264'
+        output_params = ['-crf', str(crf), '-preset', encoder_preset,
+                         '-movflags', MP4_STREAMING_FLAGS]
+    if audio_path:
+        # No usamos -shortest porque el video ya tiene la duración del audio
+        output_params += ['-b:a', '192k', '-frag_duration', '1000000']
+    writer = imageio_ffmpeg.write_frames(
+        output_path,
+        (out_w, out_h),
+        pix_fmt_in='rgb24',
+        fps=fps,
+        codec=video_codec,
+        quality=None,
+        audio_path=audio_path,
+        audio_codec='aac' if audio_path else None,
+        output_params=output_params,
+    )
+    writer.send(None)  # seed the generator
+
+    # Center-crop origin (constant across frames)
+    x0 = (W - out_w) // 2
+    y0 = (H - out_h) // 2
+
+    # Con zoom fijo en 1.0 el transform es una traslación pura y el frame
+    # sale de un recorte directo de base_cov, sin warp de canvas completo
+    pure_pan = bool(np.all(sched_zoom == 1.0))
+
+    # Matrices afines inversas de todos los frames, de una vez (N, 2, 3):
+    # con WARP_INVERSE_MAP OpenCV se salta la inversión por llamada
+    sched_M_inv = None
+    if not pure_pan:
+        sched_M_inv = compute_affine_matrices(sched_tx, sched_ty, sched_zoom,
+                                              cx, cy, inverse=True)
+        # Plegar el origen del recorte en las matrices: el warp escribe
+        # directamente el frame (out_w, out_h) en vez del canvas completo
+        # más un slice — ~35% menos escritura por frame con margen 1.25x
+        sched_M_inv[:, 0, 2] += sched_M_inv[:, 0, 0] * x0
+        sched_M_inv[:, 1, 2] += sched_M_inv[:, 1, 1] * y0
+
+    def render_frame(frame_num: int) -> np.ndarray:
+        if pure_pan:
+            tx = float(sched_tx[frame_num])
+            ty = float(sched_ty[frame_num])
+            sx = x0 - tx
+            sy = y0 - ty
+            if numba is not None and sx.is_integer() and sy.is_integer():
+                # Traslación entera: crop + blend fusionados en un kernel
+                return _render_pan_blend(base_cov, int(sy), int(sx),
+                                         out_w, out_h, overlay_blend)
+            frame = _crop_translated(base_cov, tx, ty, x0, y0, out_w, out_h)
         else:
-            tx = 0
-            ty = 0
-        
-        # Apply transform
-        A = make_affine_matrix(tx, ty, zoom, 0, cx, cy)
-        M = affine_to_perspective(A)
-        frame = apply_transform(base_cov, M, (W, H))
-        
-        # Center crop
-        x0 = (W - out_w) // 2
-        y0 = (H - out_h) // 2
-        frame = frame[y0:y0 + out_h, x0:x0 + out_w]
-        
+            # Apply transform straight at output size (crop plegado en M)
+            frame = cv2.warpAffine(
+                base_cov, sched_M_inv[frame_num], (out_w, out_h),
+                flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                borderMode=cv2.BORDER_REPLICATE)
+
         # Apply text overlay
-        frame = apply_overlay(frame, text_overlay)
-        
-        # Convert BGR to RGB
-        frame_rgb = frame[:, :, ::-1]
-        frames.append(frame_rgb)
-    
-    # Write video using imageio with ffmpeg
-    if audio_path:
-        # Si hay audio, primero guardamos el video sin audio
-        temp_video_path = output_path.replace('.mp4', '_temp.mp4')
-        imageio.mimsave(
-            temp_video_path,
-            frames,
-            fps=fps,
-            codec='libx264',
-            pixelformat='yuv420p',
-            output_params=['-crf', '23', '-preset', 'medium']
-        )
-        
-        # Luego mezclamos video con audio usando ffmpeg
-        import subprocess
-        import os
-        
+        if overlay_blend is not None:
+            frame = _blend_overlay(frame, overlay_blend)
+
+        return frame
+
+    # Productor/consumidor: el render llena una cola acotada y el hilo
+    # principal la drena hacia ffmpeg, así render y encode se solapan en
+    # vez de sumarse (la cota evita acumular frames en RAM)
+    frame_q = queue.Queue(maxsize=16)
+
+    def produce_frames():
         try:
-            # Comando ffmpeg para mezclar video y audio
-            # No usamos -shortest porque el video ya tiene la duración del audio
-            cmd = [
-                'ffmpeg',
-                '-y',  # Sobrescribir archivo de salida
-                '-i', temp_video_path,  # Video input
-                '-i', audio_path,  # Audio input
-                '-c:v', 'copy',  # Copiar video sin re-encodear
-                '-c:a', 'aac',  # Codec de audio
-                '-b:a', '192k',  # Bitrate de audio
-                output_path
-            ]
-            
-            subprocess.run(cmd, check=True, capture_output=True)
-            
-            # Eliminar video temporal
-            os.remove(temp_video_path)
-            
-        except subprocess.CalledProcessError as e:
-            # Si falla, renombrar el video temporal como salida
-            import shutil
-            shutil.move(temp_video_path, output_path)
-            print(f"Warning: Could not add audio. Video saved without audio: {e}")
-        except FileNotFoundError:
-            # ffmpeg no está instalado
-            import shutil
-            shutil.move(temp_video_path, output_path)
-            print("Warning: ffmpeg not found. Video saved without audio.")
-    else:
-        # Sin audio, guardar directamente
-        imageio.mimsave(
-            output_path,
-            frames,
-            fps=fps,
-            codec='libx264',
-            pixelformat='yuv420p',
-            output_params=['-crf', '23', '-preset', 'medium']
-        )
+            if _CUDA_AVAILABLE and not pure_pan:
+                # Warp en GPU: base_cov se sube una sola vez y cada frame
+                # baja ya recortado para el blend y el encode en CPU
+                for frame in _render_frames_cuda(base_cov, sched_M_inv, total_frames,
+                                                 out_w, out_h, overlay_blend):
+                    frame_q.put(frame)
+            else:
+                # warpAffine y las operaciones numpy sueltan el GIL, así que
+                # los frames se renderizan en paralelo. Ventana acotada de
+                # futures en vez de executor.map: map() encola todos los
+                # frames de entrada y, si el encoder va lento, los ya
+                # renderizados se acumulan fuera de la cola sin límite
+                workers = os.cpu_count() or 1
+                max_inflight = workers * 2
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    pending = deque()
+                    for frame_num in range(total_frames):
+                        pending.append(executor.submit(render_frame, frame_num))
+                        if len(pending) >= max_inflight:
+                            frame_q.put(pending.popleft().result())
+                    while pending:
+                        frame_q.put(pending.popleft().result())
+        except BaseException as exc:
+            frame_q.put(exc)
+        else:
+            frame_q.put(None)  # centinela de fin de stream
+
+    producer = threading.Thread(target=produce_frames, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = frame_q.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            writer.send(item)
+    finally:
+        try:
+            writer.close()
+        finally:
+            # Si el encode abortó, drenar la cola para que el productor no
+            # quede bloqueado en un put() sobre cola llena
+            while producer.is_alive():
+                try:
+                    frame_q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+
 
 # Nueva función para agregar al final de video_generator.py
 
@@ -667,8 +1122,6 @@ def make_static_video_with_audio(
         logo_path: Ruta al archivo del logo (default: None, sin logo)
         logo_scale: Escala del logo relativa al ancho de la imagen (default: 0.10)
     """
-    import tempfile
-    
     print(f"🎬 Generando video estático con audio...")
     
     # Get audio duration
@@ -696,8 +1149,8 @@ def make_static_video_with_audio(
             logo_height = int(logo_img.height * (logo_width / logo_img.width))
             logo_img = logo_img.resize((logo_width, logo_height), Image.Resampling.LANCZOS)
             
-            # Convert base image to PIL for compositing
-            base_pil = Image.fromarray(cv2.cvtColor(base, cv2.COLOR_BGR2RGB))
+            # Convert base image to PIL for compositing (ya está en RGB)
+            base_pil = Image.fromarray(base)
             
             # Position logo in top-right corner with margin
             margin = int(w * 0.02)
@@ -707,66 +1160,52 @@ def make_static_video_with_audio(
             # Paste logo
             base_pil.paste(logo_img, (logo_x, logo_y), logo_img)
             
-            # Convert back to OpenCV format
-            base = cv2.cvtColor(np.array(base_pil), cv2.COLOR_RGB2BGR)
+            # Convert back to numpy (RGB)
+            base = np.array(base_pil)
             
             print(f"✅ Logo añadido: {logo_width}x{logo_height} en esquina superior derecha")
         except Exception as e:
             print(f"⚠️  No se pudo cargar el logo: {e}")
     
-    # Calculate total frames
-    total_frames = int(audio_duration * fps)
-    
-    print(f"🎞️  Generando {total_frames} frames a {fps} FPS...")
-    
-    # Create temporary video without audio
-    temp_video_path = output_path.replace('.mp4', '_temp.mp4')
-    
+    # La imagen es estática: en vez de escribir audio_duration*fps frames
+    # idénticos y re-muxear, dejamos que ffmpeg repita la imagen con -loop 1
+    # y mezcle el audio en una sola pasada.
+    temp_image_path = output_path.replace('.mp4', '_frame.png')
+    cv2.imwrite(temp_image_path, cv2.cvtColor(base, cv2.COLOR_RGB2BGR))
+
     try:
-        # Write frames (all identical for static video)
-        writer = imageio.get_writer(
-            temp_video_path,
-            fps=fps,
-            codec='libx264',
-            pixelformat='yuv420p',
-            quality=8,
-            macro_block_size=16
-        )
-        
-        # Convert to RGB for imageio
-        frame_rgb = cv2.cvtColor(base, cv2.COLOR_BGR2RGB)
-        
-        # Write all frames (same image repeated)
-        for i in range(total_frames):
-            writer.append_data(frame_rgb)
-            if (i + 1) % 100 == 0:
-                print(f"  Progreso: {i + 1}/{total_frames} frames ({(i + 1) / total_frames * 100:.1f}%)")
-        
-        writer.close()
-        print(f"✅ Video sin audio generado: {temp_video_path}")
-        
-        # Mix with audio using ffmpeg
-        print(f"🎵 Mezclando con audio...")
+        print(f"🎵 Codificando video estático con audio en una sola pasada de ffmpeg...")
         cmd = [
-            'ffmpeg',
+            FFMPEG_EXE,
             '-y',
-            '-i', temp_video_path,
+            '-loop', '1',
+            '-framerate', str(fps),
+            '-i', temp_image_path,
             '-i', audio_path,
-            '-c:v', 'copy',
+            '-c:v', 'libx264',
+            '-tune', 'stillimage',
+            '-pix_fmt', 'yuv420p',
+            # x264 con yuv420p requiere dimensiones pares
+            '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
             '-c:a', 'aac',
             '-b:a', '192k',
+            '-movflags', MP4_STREAMING_FLAGS,
+            '-frag_duration', '1000000',
+            # -shortest corta tarde con -loop 1 (deja una cola congelada de
+            # varios segundos); -t fija la duración exacta del audio
+            '-t', str(audio_duration),
             output_path
         ]
-        
+
         result = subprocess.run(cmd, capture_output=True, text=True)
-        
+
         if result.returncode != 0:
             raise Exception(f"FFmpeg error: {result.stderr}")
-        
+
         print(f"✅ Video final con audio guardado: {output_path}")
-        
+
     finally:
-        # Clean up temporary video
-        if os.path.exists(temp_video_path):
-            os.remove(temp_video_path)
+        # Clean up temporary frame image
+        if os.path.exists(temp_image_path):
+            os.remove(temp_image_path)
 